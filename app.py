@@ -1,57 +1,572 @@
+import cProfile
 import io
-import numpy as np
+import json
+import marshal
+import math
+import os
+import re
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor
+from concurrent.futures import wait as futures_wait
 from PIL import Image
-import trimesh
-from flask import Flask, request, send_file, abort, Response, redirect, url_for
+from flask import Flask, request, send_file, abort, Response, redirect, url_for, jsonify, g, stream_with_context
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
+
+import metrics
+from artifacts import ArtifactStore
+from glb_cache import GLBCache, cache_key, source_digest
+from glb_writer import grid_layout, iter_gallery_glb
+from convert import USE_TRIMESH_WRITER, create_glb_from_image, prepare_texture
+from jobs import CANCELLED, DONE, QUEUED, RUNNING, TIMEOUT, JobManager, JobTimeout, QueueFull
+from texture import DEFAULT_QUALITY, QUALITY_TIERS, TextureTooLarge, max_edge_for
 
 # ---- Flask App ----
 app = Flask(__name__)
 CORS(app)
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("GLB_MAX_UPLOAD_BYTES", 32 * 1024 * 1024))
+
+# ---- Texture limits ----
+# Hard cap on the texture edge for every quality tier (0 disables it).
+MAX_TEXTURE_EDGE = int(os.environ.get("GLB_MAX_TEXTURE_EDGE", 4096))
+
+# ---- Artifact store ----
+# Generated GLBs are published as immutable /models/<key>.glb URLs. The
+# store is also the GLB cache's disk tier.
+artifacts = ArtifactStore(
+    root=os.environ.get("GLB_ARTIFACT_DIR") or os.path.join(tempfile.gettempdir(), "ar-module1-models"),
+    max_bytes=int(os.environ.get("GLB_ARTIFACT_MAX_BYTES", 2 * 1024 * 1024 * 1024)),
+)
+
+# ---- GLB cache ----
+glb_cache = GLBCache(
+    max_bytes=int(os.environ.get("GLB_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    store=artifacts,
+)
+_KEY_RE = re.compile(r"[0-9a-f]{64}\Z")
+
+# ---- Job pool ----
+# Conversions run in worker processes; at most GLB_MAX_PENDING_JOBS may be
+# queued or running before submits are refused with 429. GLB_JOB_TIMEOUT
+# counts from submission, so it includes time spent waiting in the queue.
+jobs = JobManager(
+    max_workers=int(os.environ.get("GLB_WORKERS", os.cpu_count() or 1)),
+    max_pending=int(os.environ.get("GLB_MAX_PENDING_JOBS", 32)),
+    timeout_s=float(os.environ.get("GLB_JOB_TIMEOUT", 60)),
+    result_ttl_s=float(os.environ.get("GLB_JOB_RESULT_TTL", 300)),
+)
+# Results are stored from here rather than in the pool's done-callbacks,
+# which run on the thread that also feeds work to the workers.
+_store_results = ThreadPoolExecutor(max_workers=2, thread_name_prefix="glb-store")
+MAX_BATCH_FILES = int(os.environ.get("GLB_MAX_BATCH_FILES", 64))
+# Upload limit for a whole /make-glb/batch request; MAX_CONTENT_LENGTH is
+# sized for a single image.
+MAX_BATCH_BYTES = int(os.environ.get("GLB_MAX_BATCH_BYTES", 256 * 1024 * 1024))
+
+# ---- Instrumentation ----
+@app.before_request
+def _begin_request():
+    metrics.IN_FLIGHT.add(1)
+    g.started = time.perf_counter()
+    g.metrics_token = metrics.begin()
+    if app.debug and request.args.get("profile") == "1":
+        # Conversions run inline while profiling so the dump covers them.
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def _finish_request(resp):
+    stages = metrics.end(g.pop("metrics_token"))
+    elapsed = time.perf_counter() - g.started
+    endpoint = request.endpoint or "unknown"
+    metrics.observe_stages(stages)
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint)
+    metrics.REQUESTS.inc(endpoint, request.method, str(resp.status_code))
+    input_bytes = g.get("input_bytes")
+    output_bytes = g.get("output_bytes")
+    if input_bytes is not None:
+        metrics.INPUT_BYTES.observe(input_bytes)
+    if output_bytes is not None:
+        metrics.OUTPUT_BYTES.observe(output_bytes)
+    if stages or input_bytes is not None:
+        resp.headers["Server-Timing"] = metrics.server_timing(
+            stages + [("total", elapsed)], input=input_bytes, output=output_bytes)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        profiler.create_stats()
+        # Same format as cProfile's -o output; open with pstats.Stats(path).
+        resp = Response(marshal.dumps(profiler.stats), mimetype="application/octet-stream")
+        resp.headers["Content-Disposition"] = "attachment; filename=profile.prof"
+    return resp
+
+@app.teardown_request
+def _teardown_request(exc):
+    metrics.IN_FLIGHT.add(-1)
+    if "metrics_token" in g:
+        metrics.end(g.pop("metrics_token"))
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
 
 @app.route("/")
 def home():
     # Redirect root to /viewer
     return redirect(url_for("viewer"))
 
-def create_glb_from_image(file_like, width_m=0.5, thickness_m=0.01):
-    img = Image.open(file_like).convert("RGBA")
-    w_px, h_px = img.size
-    aspect = h_px / float(w_px)
+def _float_param(name, default, allow_zero=False):
+    raw = request.values.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        abort(400, "'%s' must be a number." % name)
+    if not math.isfinite(value) or value < 0 or (value == 0 and not allow_zero):
+        abort(400, "'%s' must be a %s number."
+              % (name, "non-negative" if allow_zero else "positive"))
+    return value
 
-    W = float(width_m)
-    H = W * aspect
-    T = float(thickness_m)
+def _conversion_options():
+    """Validated ``(width_m, thickness_m, max_edge)`` from the request."""
+    width_m = _float_param("width_m", 0.5)
+    thickness_m = _float_param("thickness_m", 0.01)
+    quality = request.values.get("quality", DEFAULT_QUALITY)
+    if quality not in QUALITY_TIERS:
+        abort(400, "'quality' must be one of: %s." % ", ".join(QUALITY_TIERS))
+    return width_m, thickness_m, max_edge_for(quality, MAX_TEXTURE_EDGE)
 
-    box = trimesh.creation.box(extents=(W, H, T))
-    box.apply_translation((0, 0, T/2.0))
+def _key_for(data, width_m, thickness_m, max_edge):
+    # The key is derived from the upload and parameters only, so it doubles
+    # as a strong ETag: a client that already holds it needs no body.
+    with metrics.stage("hash"):
+        digest = source_digest(data)
+    return _key_from_digest(digest, width_m, thickness_m, max_edge)
+
+def _key_from_digest(digest, width_m, thickness_m, max_edge):
+    return cache_key(
+        digest,
+        width_m=width_m,
+        thickness_m=thickness_m,
+        max_edge=max_edge or 0,
+        writer="trimesh" if USE_TRIMESH_WRITER else "glb",
+    )
+
+def _conversion_request():
+    """Validate a conversion upload; returns ``(data, args, key)`` where
+    ``args`` are the remaining create_glb_from_image arguments."""
+    if 'file' not in request.files:
+        abort(400, "Upload an image under 'file'.")
+    f = request.files['file']
+    args = _conversion_options()
+    data = f.read()
+    g.input_bytes = len(data)
+    return data, args, _key_for(data, *args)
+
+def _submit_job(fn, args, key=None):
+    """Submit ``fn(*args)`` to the job pool. When ``key`` is given the
+    result is a GLB: it is served from and stored into the cache."""
+    if "profiler" in g:
+        # Stages land directly in the request's list.
+        try:
+            return jobs.completed((fn(*args), [], 0), key=key)
+        except Exception as exc:
+            return jobs.completed(key=key, error=exc)
+    if key is not None:
+        with metrics.stage("cache"):
+            glb_bytes = glb_cache.get(key)
+        if glb_bytes is not None:
+            return jobs.completed((glb_bytes, [], 0), key=key)
+    # Jobs resolve to (result, worker stages, worker peak RSS).
+    job = jobs.submit(metrics.run_timed, fn, *args, key=key)
+
+    def _record(future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        result, stages, peak_rss = future.result()
+        metrics.observe_job(stages, peak_rss)
+        if key is not None:
+            _store_results.submit(glb_cache.put, key, result)
+    job.future.add_done_callback(_record)
+    return job
+
+def _start_job(data, args, key):
+    try:
+        return _submit_job(create_glb_from_image, (io.BytesIO(data),) + args, key)
+    except QueueFull as exc:
+        resp = jsonify(error=str(exc))
+        resp.status_code = 429
+        resp.headers["Retry-After"] = str(exc.retry_after)
+        abort(resp)
+
+def _iter_batch(fn, tasks):
+    """Run ``fn(*args)`` for each ``(args, key)`` in ``tasks`` on the job
+    pool, yielding ``(index, result, error)`` in completion order.
+
+    At most one job per pool worker is in flight, so a large batch neither
+    monopolises the queue nor gets refused outright when it is busy.
+    """
+    todo = deque(enumerate(tasks))
+    running = {}
+    wait_s = jobs.timeout_s + 1.0 if jobs.timeout_s else None
+    try:
+        while todo or running:
+            while todo and len(running) < jobs.max_workers:
+                index, (args, key) = todo[0]
+                try:
+                    job = _submit_job(fn, args, key)
+                except QueueFull as exc:
+                    if running:
+                        break
+                    time.sleep(min(exc.retry_after, 1.0))
+                    continue
+                todo.popleft()
+                running[job.future] = (index, job)
 
-    uv = np.zeros((len(box.vertices), 2), dtype=np.float32)
-    verts = box.vertices
-    min_xy = verts[:, :2].min(axis=0)
-    max_xy = verts[:, :2].max(axis=0)
-    span_xy = np.maximum(max_xy - min_xy, 1e-8)
-    uv[:] = (verts[:, :2] - min_xy) / span_xy
+            done, _ = futures_wait(running, timeout=wait_s, return_when=FIRST_COMPLETED)
+            if not done:
+                for index, job in running.values():
+                    jobs.cancel(job.id)
+                    yield index, None, JobTimeout("Job exceeded %.1fs." % jobs.timeout_s)
+                running.clear()
+                continue
+            for future in done:
+                index, job = running.pop(future)
+                jobs.discard(job.id)
+                if future.cancelled():
+                    yield index, None, CancelledError()
+                elif future.exception() is not None:
+                    yield index, None, future.exception()
+                else:
+                    result, stages, _ = future.result()
+                    metrics.extend(stages)
+                    yield index, result, None
+    finally:
+        # Client went away or the caller bailed out: drop the rest.
+        for index, job in running.values():
+            jobs.cancel(job.id)
 
-    texture = trimesh.visual.texture.TextureVisuals(uv=uv, image=img)
-    box.visual = texture
+def _error_message(exc):
+    if isinstance(exc, Image.UnidentifiedImageError):
+        return "Unsupported or corrupt image."
+    return str(exc)
 
-    glb_bytes = box.export(file_type="glb")
-    return glb_bytes if isinstance(glb_bytes, bytes) else glb_bytes.read()
+def _abort_for_error(exc):
+    if isinstance(exc, TextureTooLarge):
+        abort(413, str(exc))
+    if isinstance(exc, Image.UnidentifiedImageError):
+        abort(400, _error_message(exc))
+    if isinstance(exc, JobTimeout):
+        abort(504, str(exc))
+    if isinstance(exc, CancelledError):
+        abort(409, "Job was cancelled.")
+    raise exc
+
+def _send_glb(glb_bytes, key):
+    g.output_bytes = len(glb_bytes)
+    with metrics.stage("send"):
+        return send_file(
+            io.BytesIO(glb_bytes),
+            mimetype="model/gltf-binary",
+            as_attachment=True,
+            download_name="photo_frame.glb",
+            etag=key,
+        )
+
+def _not_modified(key):
+    glb_cache.record_not_modified()
+    resp = Response(status=304)
+    resp.set_etag(key)
+    resp.headers["Content-Location"] = _model_url(key)
+    return resp
+
+def _model_url(key):
+    return url_for("model", key=key)
+
+def _publish(key, glb_bytes):
+    # Idempotent; makes sure the URL handed out below resolves even if the
+    # job's done-callback has not finished writing the artifact yet. None
+    # if the artifact could not be written (e.g. the disk is full).
+    with metrics.stage("publish"):
+        if not artifacts.put(key, glb_bytes):
+            return None
+    return _model_url(key)
 
 @app.route("/make-glb", methods=["POST"])
 def make_glb():
-    if 'file' not in request.files:
-        abort(400, "Upload an image under 'file'.")
-    f = request.files['file']
-    glb_bytes = create_glb_from_image(f.stream)
-    return send_file(
-        io.BytesIO(glb_bytes),
+    data, args, key = _conversion_request()
+    if request.if_none_match.contains(key):
+        return _not_modified(key)
+
+    job = _start_job(data, args, key)
+    cache_status = "HIT" if job.future.done() else "MISS"
+    try:
+        with metrics.stage("job"):
+            glb_bytes, stages, _ = jobs.wait(job)
+        metrics.extend(stages)
+    except Exception as exc:
+        _abort_for_error(exc)
+    finally:
+        jobs.discard(job.id)
+
+    url = _publish(key, glb_bytes)
+    if request.values.get("response") == "url":
+        if url is None:
+            abort(503, "Could not store the model; try again later.")
+        g.output_bytes = len(glb_bytes)
+        resp = jsonify(url=url, etag=key, bytes=len(glb_bytes))
+        resp.set_etag(key)
+    else:
+        resp = _send_glb(glb_bytes, key)
+    if url is not None:
+        resp.headers["Content-Location"] = url
+    resp.headers["X-Cache"] = cache_status
+    return resp
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    data, args, key = _conversion_request()
+    job = _start_job(data, args, key)
+    body = job.to_dict()
+    body["status_url"] = url_for("job_status", job_id=job.id)
+    body["result_url"] = url_for("job_result", job_id=job.id)
+    resp = jsonify(body)
+    resp.status_code = 202
+    resp.headers["Location"] = url_for("job_status", job_id=job.id)
+    return resp
+
+def _get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404, "Unknown or expired job.")
+    return job
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = _get_job(job_id)
+    body = job.to_dict()
+    if body["status"] == DONE:
+        url = _publish(job.key, job.future.result()[0])
+        if url is not None:
+            body["model_url"] = url
+    return jsonify(body)
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    _get_job(job_id)
+    return jsonify(jobs.cancel(job_id).to_dict())
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    job = _get_job(job_id)
+    if request.if_none_match.contains(job.key):
+        return _not_modified(job.key)
+    status = job.status
+    if status in (QUEUED, RUNNING):
+        resp = jsonify(job.to_dict())
+        resp.status_code = 202
+        return resp
+    if status == CANCELLED:
+        abort(409, "Job was cancelled.")
+    if status == TIMEOUT:
+        # Not cancelled here: the worker's own alarm stops it, and the job
+        # keeps reporting "timeout".
+        abort(504, "Job exceeded %.1fs." % jobs.timeout_s)
+    if status != DONE:
+        _abort_for_error(job.error)
+    glb_bytes = job.future.result()[0]
+    resp = _send_glb(glb_bytes, job.key)
+    url = _publish(job.key, glb_bytes)
+    if url is not None:
+        resp.headers["Content-Location"] = url
+    return resp
+
+class _ChunkWriter:
+    # Minimal write-only file for zipfile; the response drains it after each
+    # entry. No tell()/seek(), so zipfile writes data descriptors instead of
+    # seeking back to patch local headers.
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _entry_names(filenames):
+    names = []
+    seen = set()
+    for i, filename in enumerate(filenames):
+        stem = secure_filename(os.path.splitext(filename or "")[0]) or "frame_%d" % i
+        name = stem + ".glb"
+        n = 2
+        while name in seen:
+            name = "%s-%d.glb" % (stem, n)
+            n += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+def _zip_batch(uploads, args):
+    names = _entry_names([filename for filename, _ in uploads])
+    tasks = [((io.BytesIO(data),) + args, _key_for(data, *args)) for _, data in uploads]
+
+    def generate():
+        out = _ChunkWriter()
+        errors = {}
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+            for index, glb_bytes, exc in _iter_batch(create_glb_from_image, tasks):
+                if exc is not None:
+                    errors[names[index]] = _error_message(exc)
+                    continue
+                zf.writestr(names[index], glb_bytes)
+                yield out.take()
+            if errors:
+                zf.writestr("errors.json", json.dumps(errors, indent=2))
+        yield out.take()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/zip",
+        headers={"Content-Disposition": "attachment; filename=photo_frames.zip"},
+    )
+
+def _gallery_batch(uploads, args):
+    width_m, thickness_m, max_edge = args
+    gap_m = _float_param("gap_m", 0.05, allow_zero=True)
+    columns = request.values.get("columns", type=int) or math.ceil(math.sqrt(len(uploads)))
+    if columns < 1:
+        abort(400, "'columns' must be a positive integer.")
+
+    # Only textures are prepared in parallel; the single GLB needs every
+    # image's size before its header can be written.
+    textures = [None] * len(uploads)
+    tasks = [((io.BytesIO(data), max_edge), None) for _, data in uploads]
+    for index, texture, exc in _iter_batch(prepare_texture, tasks):
+        if exc is not None:
+            _abort_for_error(exc)
+        textures[index] = texture
+
+    sizes = [(width_m, width_m * h / float(w)) for _, _, (w, h) in textures]
+    centres = grid_layout(sizes, columns, gap_m)
+    frames = [(tex_bytes, mime_type, W, H, centre)
+              for (tex_bytes, mime_type, _), (W, H), centre in zip(textures, sizes, centres)]
+    return Response(
+        iter_gallery_glb(frames, thickness_m),
         mimetype="model/gltf-binary",
-        as_attachment=True,
-        download_name="photo_frame.glb"
+        headers={"Content-Disposition": "attachment; filename=photo_gallery.glb"},
+    )
+
+@app.route("/make-glb/batch", methods=["POST"])
+def make_glb_batch():
+    # Must be set before the form is parsed.
+    request.max_content_length = MAX_BATCH_BYTES
+    files = request.files.getlist("file")
+    if not files:
+        abort(400, "Upload one or more images under 'file'.")
+    if len(files) > MAX_BATCH_FILES:
+        abort(413, "At most %d images per batch." % MAX_BATCH_FILES)
+    mode = request.values.get("mode", "zip")
+    if mode not in ("zip", "gallery"):
+        abort(400, "'mode' must be 'zip' or 'gallery'.")
+    args = _conversion_options()
+    uploads = [(f.filename, f.read()) for f in files]
+    g.input_bytes = sum(len(data) for _, data in uploads)
+    if mode == "gallery":
+        return _gallery_batch(uploads, args)
+    return _zip_batch(uploads, args)
+
+@app.route("/models/<key>.glb")
+def model(key):
+    if not _KEY_RE.match(key):
+        abort(404)
+    # Byte ranges refer to the GLB itself, so range requests always get the
+    # identity encoding.
+    if request.range is None:
+        path, encoding = artifacts.variant(key, request.accept_encodings)
+    else:
+        path, encoding = artifacts.path(key), None
+    try:
+        resp = send_file(
+            path,
+            mimetype="model/gltf-binary",
+            conditional=True,
+            etag=key if encoding is None else "%s-%s" % (key, encoding),
+            download_name=key + ".glb",
+            max_age=31536000,
+        )
+    except FileNotFoundError:
+        abort(404)
+    artifacts.touch(key)
+    resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    resp.headers["Vary"] = "Accept-Encoding"
+    if encoding is not None:
+        resp.headers["Content-Encoding"] = encoding
+    return resp
+
+@app.route("/models/by-source/<digest>")
+def model_by_source(digest):
+    # Lets clients that hashed an image locally (SHA-256 of the exact bytes
+    # they would upload) skip the upload when the model already exists.
+    if not _KEY_RE.match(digest):
+        abort(400, "Expected a lowercase hex SHA-256 digest.")
+    key = _key_from_digest(digest, *_conversion_options())
+    if not artifacts.exists(key):
+        resp = jsonify(error="No model for this image yet.")
+        resp.status_code = 404
+    else:
+        resp = jsonify(url=_model_url(key), etag=key)
+        resp.headers["Content-Location"] = _model_url(key)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@app.route("/capabilities")
+def capabilities():
+    return jsonify(
+        hash="sha256",
+        lookup_url=url_for("model_by_source", digest="") + "{digest}",
+        upload_url=url_for("make_glb"),
+        max_upload_bytes=app.config["MAX_CONTENT_LENGTH"],
+        batch_url=url_for("make_glb_batch"),
+        max_batch_files=MAX_BATCH_FILES,
+        max_batch_bytes=MAX_BATCH_BYTES,
+        max_texture_edge=MAX_TEXTURE_EDGE,
+        quality_tiers={q: max_edge_for(q, MAX_TEXTURE_EDGE) or 0 for q in QUALITY_TIERS},
+        default_quality=DEFAULT_QUALITY,
     )
 
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify(glb_cache.stats())
+
+_CACHE_GAUGES = [
+    metrics.Gauge("glb_cache_%s" % name, "GLB cache %s." % name.replace("_", " "),
+                  lambda name=name: glb_cache.stats()[name])
+    for name in ("memory_hits", "disk_hits", "misses", "not_modified",
+                 "memory_evictions", "disk_evictions", "memory_bytes", "disk_bytes")
+]
+_JOBS_PENDING = metrics.Gauge("glb_jobs_pending", "Jobs queued or running.", jobs.pending)
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(_CACHE_GAUGES + [_JOBS_PENDING]),
+                    mimetype="text/plain; version=0.0.4")
+
+@app.route("/healthz")
+def healthz():
+    return Response("ok\n", mimetype="text/plain")
+
 @app.route("/viewer")
 def viewer():
     html = """
@@ -65,7 +580,9 @@ def viewer():
       <body>
         <h2>Upload an image → place it in AR</h2>
         <input id="file" type="file" accept="image/*" />
+        <select id="quality"></select>
         <button id="btn">Make GLB</button>
+        <span id="status"></span>
         <br><br>
         <model-viewer id="viewer"
           ar
@@ -78,20 +595,135 @@ def viewer():
         </model-viewer>
 
         <script>
+          const capsReady = fetch("/capabilities").then(r => {
+            if (!r.ok) throw new Error("Could not load server settings: " + r.status);
+            return r.json();
+          }).then(caps => {
+            const select = document.getElementById("quality");
+            for (const name of Object.keys(caps.quality_tiers)) {
+              select.add(new Option(name, name, false, name === caps.default_quality));
+            }
+            return caps;
+          });
+          capsReady.catch(e => setStatus(e.message));
+
+          function setStatus(text) {
+            document.getElementById("status").textContent = text;
+          }
+
+          async function sha256Hex(blob) {
+            // crypto.subtle only exists in secure contexts (https, localhost).
+            if (!window.crypto || !crypto.subtle) return null;
+            const digest = await crypto.subtle.digest("SHA-256", await blob.arrayBuffer());
+            return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+          }
+
+          async function lookup(caps, blob, quality) {
+            const digest = await sha256Hex(blob);
+            if (!digest) return null;
+            const url = caps.lookup_url.replace("{digest}", digest) + "?quality=" + quality;
+            const res = await fetch(url, { method: "HEAD" });
+            return res.ok ? res.headers.get("Content-Location") : null;
+          }
+
+          async function downscale(file, maxEdge) {
+            // Shrink to the server's texture limit before uploading; the
+            // server would discard the extra pixels anyway.
+            if (!maxEdge || !window.createImageBitmap) return file;
+            let bitmap;
+            try {
+              bitmap = await createImageBitmap(file);
+            } catch (e) {
+              return file;  // a format the browser cannot decode
+            }
+            const scale = maxEdge / Math.max(bitmap.width, bitmap.height);
+            if (scale >= 1) return file;
+            const canvas = document.createElement("canvas");
+            canvas.width = Math.max(1, Math.round(bitmap.width * scale));
+            canvas.height = Math.max(1, Math.round(bitmap.height * scale));
+            const ctx = canvas.getContext("2d");
+            ctx.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+            const alpha = ctx.getImageData(0, 0, canvas.width, canvas.height).data;
+            let opaque = true;
+            for (let i = 3; i < alpha.length; i += 4) {
+              if (alpha[i] !== 255) { opaque = false; break; }
+            }
+            const type = opaque ? "image/jpeg" : "image/png";
+            const blob = await new Promise(resolve => canvas.toBlob(resolve, type, 0.9));
+            return blob || file;
+          }
+
+          async function upload(caps, blob, name, quality) {
+            const fd = new FormData();
+            fd.append("file", blob, name);
+            fd.append("quality", quality);
+            const res = await fetch(caps.upload_url + "?response=url", { method:"POST", body:fd });
+            if (!res.ok) throw new Error("Server error: " + res.status);
+            return (await res.json()).url;
+          }
+
           document.getElementById("btn").onclick = async () => {
             const f = document.getElementById("file").files[0];
             if (!f) return alert("Pick an image first!");
-            const fd = new FormData();
-            fd.append("file", f);
-            const res = await fetch("/make-glb", { method:"POST", body:fd });
-            if (!res.ok) {
-              alert("Server error: " + res.status);
-              return;
+            try {
+              const caps = await capsReady;
+              const quality = document.getElementById("quality").value || caps.default_quality;
+              setStatus("Checking…");
+              let url = await lookup(caps, f, quality);
+              if (!url) {
+                const scaled = await downscale(f, caps.quality_tiers[quality]);
+                // A downscaled copy has its own hash; re-encoding the same
+                // file in the same browser usually yields the same bytes.
+                if (scaled !== f) url = await lookup(caps, scaled, quality);
+                if (!url) {
+                  setStatus("Uploading…");
+                  url = await upload(caps, scaled, f.name, quality);
+                }
+              }
+              setStatus("");
+              showModel(url);
+              // Reloading the page reopens the same immutable model URL.
+              history.replaceState(null, "", "?model=" + encodeURIComponent(url));
+            } catch (e) {
+              setStatus("");
+              alert(e.message);
             }
-            const blob = await res.blob();
-            const url = URL.createObjectURL(blob);
+          }
+
+          function showModel(url) {
             document.getElementById("viewer").src = url;
           }
+
+          function forgetModel(message) {
+            // Back to the upload/lookup flow: the button regenerates it.
+            history.replaceState(null, "", location.pathname);
+            document.getElementById("viewer").removeAttribute("src");
+            setStatus(message);
+          }
+
+          async function showInitial(url) {
+            // Stored models are evicted eventually; a reload of an old
+            // ?model= link must not leave an empty viewer.
+            let res;
+            try {
+              res = await fetch(url, { method: "HEAD" });
+            } catch (e) {
+              return forgetModel("Could not load the saved model; pick the image again.");
+            }
+            if (res.ok) return showModel(url);
+            forgetModel(res.status === 404
+              ? "That model has expired; pick the image again to regenerate it."
+              : "Could not load the saved model (" + res.status + "); pick the image again.");
+          }
+
+          document.getElementById("viewer").addEventListener("error", (event) => {
+            if (event.detail && event.detail.type === "loadfailure") {
+              forgetModel("Could not load the model; pick the image again.");
+            }
+          });
+
+          const initial = new URLSearchParams(location.search).get("model");
+          if (initial && initial.startsWith("/models/")) showInitial(initial);
         </script>
       </body>
     </html>
@@ -0,0 +1,189 @@
+import gzip
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Precompressed variants, in order of preference when the client accepts
+# several. A variant is only kept if it saves at least _MIN_SAVING.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+_MIN_SAVING = 0.05
+# Trimming deletes down to this fraction of max_bytes, so a full store does
+# not evict on every put.
+_TRIM_TO = 0.9
+# How often, at most, a put rescans the directory for files written or
+# deleted by other processes.
+_RESCAN_S = 1.0
+
+
+def _compress(encoding, data):
+    if encoding == "br":
+        return brotli.compress(data, quality=9)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class ArtifactStore:
+    """Content-addressed GLB files on disk, served as immutable URLs.
+
+    ``put`` writes ``<key>.glb`` synchronously so its URL is valid as soon
+    as it returns; compressed variants are produced on a background thread.
+    Artifacts are evicted least recently used first: ``put`` of an existing
+    key, ``read`` and ``touch`` all count as a use.
+
+    Several processes (e.g. gunicorn workers) may share ``root``. Each keeps
+    its own size index and rebuilds it from the directory at most every
+    ``_RESCAN_S`` seconds while putting, so the budget applies to the
+    directory as a whole; it can be overshot by what the other processes
+    wrote since the last rescan.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()
+        self._total = 0
+        self._compressor = None
+        self._evictions = 0
+        self._scanned = 0.0
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        self._sizes.clear()
+        self._total = 0
+        self._scanned = time.monotonic()
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".glb"):
+                continue
+            key = name[:-4]
+            total = 0
+            mtime = 0.0
+            for suffix in ("",) + tuple(_SUFFIXES.values()):
+                try:
+                    st = os.stat(self.path(key) + suffix)
+                except OSError:
+                    continue
+                total += st.st_size
+                if not suffix:
+                    mtime = st.st_mtime
+            entries.append((mtime, key, total))
+        for _, key, total in sorted(entries):
+            self._sizes[key] = total
+            self._total += total
+
+    def path(self, key, encoding=None):
+        return os.path.join(self.root, key + ".glb") + (_SUFFIXES[encoding] if encoding else "")
+
+    def exists(self, key):
+        # Checked on disk: another process may have published it.
+        return os.path.exists(self.path(key))
+
+    def read(self, key):
+        try:
+            with open(self.path(key), "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        self.touch(key)
+        return data
+
+    def touch(self, key):
+        """Mark ``key`` as recently used. The mtime carries this across
+        processes and restarts; eviction goes oldest mtime first."""
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            return
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def put(self, key, data):
+        """Store ``data`` as ``<key>.glb``; returns False if it could not be
+        written."""
+        if self.exists(key):
+            self.touch(key)
+            return True
+        if not self._write(self.path(key), data):
+            return False
+        with self._lock:
+            if key in self._sizes:
+                return True  # another thread published it concurrently
+            self._sizes[key] = len(data)
+            self._total += len(data)
+            self._trim()
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1)
+        self._compressor.submit(self._write_variants, key, data)
+        return True
+
+    def _write_variants(self, key, data):
+        for encoding in ENCODINGS:
+            packed = _compress(encoding, data)
+            if len(packed) > len(data) * (1.0 - _MIN_SAVING):
+                continue
+            with self._lock:
+                if key not in self._sizes:
+                    return  # evicted meanwhile
+            if not self._write(self.path(key, encoding), packed):
+                return
+            with self._lock:
+                if key in self._sizes:
+                    self._sizes[key] += len(packed)
+                    self._total += len(packed)
+
+    def _trim(self):
+        if self._total <= self.max_bytes and time.monotonic() - self._scanned < _RESCAN_S:
+            return
+        # Pick up files other processes sharing the directory have added or
+        # removed since the index was built.
+        self._load_index()
+        if self._total <= self.max_bytes:
+            return
+        while self._total > self.max_bytes * _TRIM_TO and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self._total -= size
+            self._evictions += 1
+            for encoding in (None,) + tuple(_SUFFIXES):
+                try:
+                    os.remove(self.path(key, encoding))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._sizes), "bytes": self._total,
+                    "max_bytes": self.max_bytes, "evictions": self._evictions}
+
+    def variant(self, key, accept_encodings):
+        """Return ``(path, encoding)`` of the best stored representation
+        acceptable to the client; encoding is None for the plain GLB."""
+        for encoding in ENCODINGS:
+            if accept_encodings[encoding] > 0 and os.path.exists(self.path(key, encoding)):
+                return self.path(key, encoding), encoding
+        return self.path(key), None
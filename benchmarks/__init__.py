@@ -0,0 +1,10 @@
+"""Benchmarks for the image -> GLB pipeline.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline --out pipeline.json
+    python -m benchmarks.load --out load.json
+    python -m benchmarks.compare baseline.json pipeline.json
+
+All images are generated locally; nothing is downloaded.
+"""
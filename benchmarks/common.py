@@ -0,0 +1,61 @@
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import PIL
+
+
+def percentiles(samples):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ms = sorted(s * 1000.0 for s in samples)
+    if not ms:
+        return {}
+
+    def pct(p):
+        # Nearest-rank on the sorted samples.
+        return ms[min(len(ms) - 1, max(0, math.ceil(p / 100.0 * len(ms)) - 1))]
+
+    return {
+        "min": ms[0],
+        "p50": pct(50),
+        "p90": pct(90),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": ms[-1],
+        "mean": statistics.fmean(ms),
+    }
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def metadata():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path, kind, results, **extra):
+    doc = {"kind": kind, "meta": metadata(), "results": results}
+    doc["meta"].update(extra)
+    text = json.dumps(doc, indent=2, sort_keys=True)
+    if path in (None, "-"):
+        print(text)
+    else:
+        with open(path, "w") as fh:
+            fh.write(text + "\n")
@@ -0,0 +1,88 @@
+"""Compare benchmark results against a baseline.
+
+    python -m benchmarks.compare baseline.json current.json
+    python -m benchmarks.compare baseline.json current.json --latency 0.10
+
+Cases are matched by name. Exits with status 1 if any metric regressed by
+more than its threshold (a fraction of the baseline value).
+"""
+import argparse
+import json
+import sys
+
+# (path into a result, threshold option, higher is better)
+METRICS = (
+    (("latency_ms", "p50"), "latency", False),
+    (("latency_ms", "p95"), "latency", False),
+    (("throughput_per_s",), "throughput", True),
+    (("peak_rss_mb",), "memory", False),
+    (("worker_peak_rss_mb",), "memory", False),
+    (("output_bytes",), "size", False),
+)
+
+
+def _get(result, path):
+    for part in path:
+        if not isinstance(result, dict) or part not in result:
+            return None
+        result = result[part]
+    return result
+
+
+def compare(baseline, current, thresholds, min_latency_ms=1.0):
+    """Return ``(rows, regressions)``; each row is
+    ``(case, metric, base, new, change, regressed)``."""
+    base_by_name = {r["name"]: r for r in baseline["results"]}
+    rows = []
+    regressions = 0
+    for result in current["results"]:
+        base = base_by_name.get(result["name"])
+        if base is None:
+            continue
+        for path, option, higher_is_better in METRICS:
+            old, new = _get(base, path), _get(result, path)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / float(old)
+            worse = -change if higher_is_better else change
+            regressed = worse > thresholds[option]
+            # Sub-millisecond timings are dominated by noise.
+            if option == "latency" and max(old, new) < min_latency_ms:
+                regressed = False
+            regressions += regressed
+            rows.append((result["name"], ".".join(path), old, new, change, regressed))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--latency", type=float, default=0.20, help="allowed latency increase")
+    parser.add_argument("--throughput", type=float, default=0.20, help="allowed throughput drop")
+    parser.add_argument("--memory", type=float, default=0.20, help="allowed peak RSS increase")
+    parser.add_argument("--size", type=float, default=0.05, help="allowed GLB size increase")
+    parser.add_argument("--min-latency-ms", type=float, default=1.0,
+                        help="ignore latency changes below this many milliseconds")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    if baseline.get("kind") != current.get("kind"):
+        parser.error("cannot compare %r results with %r results"
+                     % (baseline.get("kind"), current.get("kind")))
+
+    thresholds = {"latency": args.latency, "throughput": args.throughput,
+                  "memory": args.memory, "size": args.size}
+    rows, regressions = compare(baseline, current, thresholds, args.min_latency_ms)
+    for name, metric, old, new, change, regressed in rows:
+        print("%-4s %-40s %-18s %12.2f -> %12.2f  %+7.1f%%" % (
+            "FAIL" if regressed else "ok", name, metric, old, new, change * 100.0))
+    print("%d regression(s) across %d comparisons" % (regressions, len(rows)))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
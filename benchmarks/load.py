@@ -0,0 +1,179 @@
+"""Concurrent load generator for the /make-glb route.
+
+    python -m benchmarks.load --concurrency 8 --requests 200 --out load.json
+    python -m benchmarks.load --transport http --distinct 1   # all cache hits
+
+The app is imported in-process and driven either through Flask's test
+client or through a local threaded WSGI server on 127.0.0.1. Each run uses
+a fresh, temporary artifact store.
+"""
+import argparse
+import http.client
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+from benchmarks import synth
+from benchmarks.common import percentiles, write_results
+
+
+def _multipart(data, filename, fields):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(('--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n'
+                      % (boundary, name, value)).encode())
+    parts.append(('--%s\r\nContent-Disposition: form-data; name="file"; filename="%s"\r\n'
+                  'Content-Type: application/octet-stream\r\n\r\n' % (boundary, filename)).encode())
+    parts.append(data)
+    parts.append(("\r\n--%s--\r\n" % boundary).encode())
+    return b"".join(parts), "multipart/form-data; boundary=%s" % boundary
+
+
+class _ClientTransport:
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path, body, content_type):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.post(path, data=body, content_type=content_type)
+        return resp.status_code, len(resp.get_data())
+
+    def close(self):
+        pass
+
+
+class _HTTPTransport:
+    def __init__(self, app):
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self._local = threading.local()
+
+    def post(self, path, body, content_type):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+            resp = conn.getresponse()
+            return resp.status, len(resp.read())
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run(transport, payloads, total, concurrency, path):
+    latencies = []
+    statuses = Counter()
+    received = [0]
+    lock = threading.Lock()
+
+    def one(i):
+        body, content_type = payloads[i % len(payloads)]
+        start = time.perf_counter()
+        try:
+            status, size = transport.post(path, body, content_type)
+        except (OSError, http.client.HTTPException):
+            status, size = "error", 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] += 1
+            received[0] += size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    return {
+        "latency_ms": percentiles(latencies),
+        "throughput_per_s": total / wall,
+        "wall_s": wall,
+        "statuses": dict(statuses),
+        "output_bytes": received[0] // max(1, total),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transport", choices=("client", "http"), default="client")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="distinct images to cycle through (0: one per request)")
+    parser.add_argument("--megapixels", type=float, default=2)
+    parser.add_argument("--aspect", default="4x3", choices=sorted(synth.ASPECTS))
+    parser.add_argument("--mode", default="RGB", choices=synth.MODES)
+    parser.add_argument("--format", default="JPEG", choices=synth.FORMATS)
+    parser.add_argument("--quality", default="standard")
+    parser.add_argument("--out", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    # Payloads are deterministic, so an artifact store left over from an
+    # earlier run would turn every request into a hit.
+    artifact_dir = tempfile.mkdtemp(prefix="glb-load-")
+    os.environ["GLB_ARTIFACT_DIR"] = artifact_dir
+    import metrics
+    from app import app
+
+    distinct = args.distinct or args.requests
+    size = synth.dimensions(args.megapixels, args.aspect)
+    base = synth.make_image(size, args.mode)
+    payloads = []
+    for seed in range(distinct):
+        # Touch one pixel per variant so every image hashes differently.
+        img = base.copy()
+        img.putpixel((seed % size[0], (seed // size[0]) % size[1]),
+                     (seed % 256,) * len(img.getbands()) if img.mode != "P" else seed % 64)
+        data = synth.encode(img, args.format)
+        payloads.append(_multipart(data, "bench.%s" % args.format.lower(),
+                                   {"quality": args.quality}))
+
+    transport = (_HTTPTransport if args.transport == "http" else _ClientTransport)(app)
+    try:
+        stats = run(transport, payloads, args.requests, args.concurrency, "/make-glb")
+    finally:
+        transport.close()
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stats.update(
+        name="make-glb-%s-c%d-%s-%s-%gmp-%s" % (
+            args.transport, args.concurrency, args.format.lower(), args.mode.lower(),
+            args.megapixels, args.quality),
+        params={k: v for k, v in vars(args).items() if k != "out"},
+        input_bytes=len(payloads[0][0]),
+        peak_rss_mb=peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0,
+        # Conversions run in the job pool, so their memory shows up here
+        # rather than in the web process.
+        worker_peak_rss_mb=metrics.WORKER_PEAK_RSS.value / (1024.0 * 1024.0),
+    )
+    log = print if args.out != "-" else (lambda *a: print(*a, file=sys.stderr))
+    log("%s: %.1f req/s  p50 %.1f ms  p95 %.1f ms  worker rss %.1f MB  statuses %s" % (
+        stats["name"], stats["throughput_per_s"], stats["latency_ms"]["p50"],
+        stats["latency_ms"]["p95"], stats["worker_peak_rss_mb"], stats["statuses"]))
+    write_results(args.out, "load", [stats])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark create_glb_from_image over synthetic images.
+
+    python -m benchmarks.pipeline --out pipeline.json
+    python -m benchmarks.pipeline --full --iterations 3 --out full.json
+
+Each case runs in a freshly spawned process so earlier, larger cases do not
+affect it. A spawned child's ru_maxrss starts from its parent's high-water
+mark, so on Linux peak RSS is read from VmHWM after resetting it in the
+child; elsewhere ru_maxrss is reported as is.
+"""
+import argparse
+import io
+import itertools
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import synth
+from benchmarks.common import percentiles, write_results
+
+DEFAULT_MEGAPIXELS = (0.3, 2, 12)
+DEFAULT_ASPECTS = ("4x3",)
+DEFAULT_QUALITIES = ("standard",)
+
+_SPAWN = multiprocessing.get_context("spawn")
+
+
+def _reset_peak_rss():
+    # Linux only: restarts VmHWM from the current RSS.
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb(hwm):
+    if hwm:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _run_case(data, quality, iterations, warmup):
+    # Runs in a child process.
+    from convert import create_glb_from_image
+    from texture import max_edge_for
+
+    max_edge = max_edge_for(quality, int(os.environ.get("GLB_MAX_TEXTURE_EDGE", 4096)))
+    tiny = synth.encode(synth.make_image((64, 48), "RGB"), "JPEG")
+    create_glb_from_image(io.BytesIO(tiny), 0.5, 0.01, max_edge)
+
+    hwm = _reset_peak_rss()
+    baseline = _peak_rss_mb(hwm)
+    for _ in range(warmup):
+        create_glb_from_image(io.BytesIO(data), 0.5, 0.01, max_edge)
+
+    samples = []
+    output_bytes = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        glb = create_glb_from_image(io.BytesIO(data), 0.5, 0.01, max_edge)
+        samples.append(time.perf_counter() - start)
+        output_bytes = len(glb)
+    peak = _peak_rss_mb(hwm)
+    return {
+        "latency_ms": percentiles(samples),
+        "throughput_per_s": len(samples) / sum(samples),
+        "peak_rss_mb": peak,
+        "rss_growth_mb": peak - baseline,
+        "output_bytes": output_bytes,
+    }
+
+
+def cases(megapixels, aspects, modes, formats, qualities):
+    for mp, aspect, mode, fmt, quality in itertools.product(
+            megapixels, aspects, modes, formats, qualities):
+        if synth.supported(fmt, mode):
+            yield mp, aspect, mode, fmt, quality
+
+
+def case_name(mp, aspect, mode, fmt, quality):
+    return "%s-%s-%gmp-%s-%s" % (fmt.lower(), mode.lower(), mp, aspect, quality)
+
+
+def run(megapixels, aspects, modes, formats, qualities, iterations, warmup, log=print):
+    results = []
+    for mp, aspect, mode, fmt, quality in cases(megapixels, aspects, modes, formats, qualities):
+        name = case_name(mp, aspect, mode, fmt, quality)
+        size = synth.dimensions(mp, aspect)
+        data = synth.encode(synth.make_image(size, mode), fmt)
+        with ProcessPoolExecutor(max_workers=1, mp_context=_SPAWN) as pool:
+            stats = pool.submit(_run_case, data, quality, iterations, warmup).result()
+        stats.update(
+            name=name,
+            params={"megapixels": mp, "aspect": aspect, "mode": mode,
+                    "format": fmt, "quality": quality, "size": list(size)},
+            input_bytes=len(data),
+        )
+        results.append(stats)
+        log("%-36s p50 %8.1f ms  p95 %8.1f ms  rss %7.1f MB  out %9d B" % (
+            name, stats["latency_ms"]["p50"], stats["latency_ms"]["p95"],
+            stats["peak_rss_mb"], stats["output_bytes"]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=DEFAULT_MEGAPIXELS)
+    parser.add_argument("--aspects", nargs="+", default=DEFAULT_ASPECTS, choices=sorted(synth.ASPECTS))
+    parser.add_argument("--modes", nargs="+", default=synth.MODES, choices=synth.MODES)
+    parser.add_argument("--formats", nargs="+", default=synth.FORMATS, choices=synth.FORMATS)
+    parser.add_argument("--qualities", nargs="+", default=DEFAULT_QUALITIES)
+    parser.add_argument("--full", action="store_true",
+                        help="every size, aspect ratio and quality tier")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--out", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    if args.full:
+        from texture import QUALITY_TIERS
+        args.megapixels = synth.MEGAPIXELS
+        args.aspects = tuple(synth.ASPECTS)
+        args.qualities = tuple(QUALITY_TIERS)
+
+    log = print if args.out != "-" else (lambda *a: print(*a, file=sys.stderr))
+    results = run(args.megapixels, args.aspects, args.modes, args.formats,
+                  args.qualities, args.iterations, args.warmup, log=log)
+    write_results(args.out, "pipeline", results, iterations=args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import io
+import math
+
+from PIL import Image, ImageDraw
+
+# Synthetic test images: a colour gradient with shapes and mild noise, so
+# encoders see something closer to a photo than a flat fill or pure noise.
+
+MEGAPIXELS = (0.3, 2, 12, 24, 48)
+ASPECTS = {"1x1": (1, 1), "4x3": (4, 3), "16x9": (16, 9), "3x4": (3, 4)}
+MODES = ("RGB", "RGBA", "P")
+FORMATS = ("JPEG", "PNG", "WEBP")
+
+# Formats that cannot store a given mode are skipped.
+_SUPPORTED = {
+    "JPEG": {"RGB"},
+    "PNG": {"RGB", "RGBA", "P"},
+    "WEBP": {"RGB", "RGBA"},
+}
+
+
+def supported(fmt, mode):
+    return mode in _SUPPORTED[fmt]
+
+
+def dimensions(megapixels, aspect):
+    aw, ah = ASPECTS[aspect]
+    h = math.sqrt(megapixels * 1e6 * ah / aw)
+    return max(1, int(round(h * aw / ah))), max(1, int(round(h)))
+
+
+def make_image(size, mode, seed=0):
+    w, h = size
+    # Build at low resolution and upscale: cheap even for 48 MP.
+    small = (max(1, w // 8), max(1, h // 8))
+    base = Image.merge("RGB", (
+        Image.linear_gradient("L").resize(small),
+        Image.linear_gradient("L").rotate(90).resize(small),
+        Image.radial_gradient("L").resize(small),
+    ))
+    draw = ImageDraw.Draw(base)
+    for i in range(12):
+        x = (seed * 37 + i * 53) % small[0]
+        y = (seed * 91 + i * 29) % small[1]
+        r = max(2, min(small) // (4 + i))
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=((i * 40) % 256, (seed * 70) % 256, 128))
+    img = base.resize(size, Image.BILINEAR)
+    noise = Image.effect_noise(size, 12).convert("RGB")
+    img = Image.blend(img, noise, 0.08)
+
+    if mode == "RGBA":
+        alpha = Image.radial_gradient("L").resize(size)
+        img.putalpha(alpha.point(lambda v: 255 - v // 2))
+    elif mode == "P":
+        img = img.quantize(colors=64)
+    return img
+
+
+def encode(img, fmt):
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(out, fmt, quality=90)
+    elif fmt == "PNG":
+        img.save(out, fmt, compress_level=6)
+    else:
+        img.save(out, fmt, quality=90)
+    return out.getvalue()
+
+
+def make_case(megapixels, aspect, mode, fmt, seed=0):
+    """Encoded bytes of a synthetic image for one benchmark case."""
+    return encode(make_image(dimensions(megapixels, aspect), mode, seed), fmt)
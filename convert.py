@@ -0,0 +1,101 @@
+import io
+import os
+from PIL import Image
+
+from metrics import stage
+from glb_writer import PASSTHROUGH_MIME_TYPES, write_frame_glb
+from texture import (TextureTooLarge, encode_texture, fits, load_texture, orientation,
+                     strip_metadata, upright_size)
+
+# Image -> GLB conversion. Kept free of Flask so it can run in the job
+# pool's worker processes.
+
+# Cap on how many pixels may be decoded for formats that cannot be decoded at a
+# reduced scale the way JPEG can.
+MAX_DECODE_PIXELS = int(os.environ.get("GLB_MAX_DECODE_PIXELS", 50_000_000))
+# Set GLB_WRITER=trimesh to build every GLB through trimesh's exporter.
+USE_TRIMESH_WRITER = os.environ.get("GLB_WRITER") == "trimesh"
+
+# Modes each format can be embedded in without browsers/viewers choking
+# (e.g. CMYK JPEGs render wrongly in most glTF loaders).
+_PASSTHROUGH_MODES = {"JPEG": {"L", "RGB"}, "PNG": None}
+
+
+def _open_image(data):
+    # Image.open only parses the header; pixels are decoded on first access.
+    try:
+        with stage("header"):
+            return Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as exc:
+        raise TextureTooLarge(str(exc))
+
+
+def _embeddable_texture(img, data, max_texture_edge):
+    modes = _PASSTHROUGH_MODES.get(img.format, ())
+    # Stripping drops the EXIF orientation, so only upright images can be
+    # embedded as they are.
+    if (img.format in PASSTHROUGH_MIME_TYPES and (modes is None or img.mode in modes)
+            and fits(img.size, max_texture_edge) and orientation(img) == 1):
+        stripped = strip_metadata(data, img.format)
+        if stripped is not None:
+            return stripped, PASSTHROUGH_MIME_TYPES[img.format]
+    # Oversized, not embeddable as-is or not parseable segment by segment:
+    # decode at reduced scale and re-encode.
+    return encode_texture(load_texture(img, max_texture_edge, MAX_DECODE_PIXELS))
+
+
+def prepare_texture(file_like, max_texture_edge=None):
+    """Return ``(texture_bytes, mime_type, (w_px, h_px))`` for embedding,
+    where the size is that of the original image, upright."""
+    data = file_like.read()
+    img = _open_image(data)
+    tex_bytes, mime_type = _embeddable_texture(img, data, max_texture_edge)
+    return tex_bytes, mime_type, upright_size(img)
+
+
+def create_glb_from_image(file_like, width_m=0.5, thickness_m=0.01, max_texture_edge=None):
+    data = file_like.read()
+    img = _open_image(data)
+    w_px, h_px = upright_size(img)
+    aspect = h_px / float(w_px)
+
+    W = float(width_m)
+    H = W * aspect
+    T = float(thickness_m)
+
+    if USE_TRIMESH_WRITER:
+        tex = load_texture(img, max_texture_edge, MAX_DECODE_PIXELS)
+        with stage("convert"):
+            tex = tex.convert("RGBA")
+        return _create_glb_trimesh(tex, W, H, T)
+
+    tex_bytes, mime_type = _embeddable_texture(img, data, max_texture_edge)
+    with stage("write"):
+        return write_frame_glb(tex_bytes, mime_type, W, H, T)
+
+
+def _create_glb_trimesh(img, W, H, T):
+    # Reference path: trimesh re-encodes the decoded texture as RGBA PNG.
+    # numpy and trimesh are imported here so the default writer never pays
+    # for them at startup.
+    import numpy as np
+    import trimesh
+
+    with stage("box"):
+        box = trimesh.creation.box(extents=(W, H, T))
+        box.apply_translation((0, 0, T/2.0))
+
+    with stage("uv"):
+        uv = np.zeros((len(box.vertices), 2), dtype=np.float32)
+        verts = box.vertices
+        min_xy = verts[:, :2].min(axis=0)
+        max_xy = verts[:, :2].max(axis=0)
+        span_xy = np.maximum(max_xy - min_xy, 1e-8)
+        uv[:] = (verts[:, :2] - min_xy) / span_xy
+
+    texture = trimesh.visual.texture.TextureVisuals(uv=uv, image=img)
+    box.visual = texture
+
+    with stage("export"):
+        glb_bytes = box.export(file_type="glb")
+    return glb_bytes if isinstance(glb_bytes, bytes) else glb_bytes.read()
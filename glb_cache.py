@@ -0,0 +1,100 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Bump whenever the bytes produced for a given input change, so stale
+# cache entries and client-held ETags stop matching.
+CACHE_VERSION = "4"
+
+
+def source_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(digest, **params):
+    # Params are normalised through repr(float) / str so that e.g. "0.5"
+    # from a form field and 0.5 from a default produce the same key.
+    parts = [CACHE_VERSION, digest]
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, (int, float)):
+            value = repr(float(value))
+        parts.append("%s=%s" % (name, value))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class GLBCache:
+    """Byte-budgeted LRU of generated GLBs in memory, backed by an optional
+    durable ``store`` (an :class:`artifacts.ArtifactStore`).
+
+    ``put`` writes through to the store, so entries evicted from memory are
+    simply dropped and later ``get`` calls reload them from the store.
+    """
+
+    def __init__(self, max_bytes, store=None):
+        self.max_bytes = int(max_bytes)
+        self.store = store
+        self._lock = threading.Lock()
+        self._mem = OrderedDict()
+        self._mem_bytes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "memory_evictions": 0,
+        }
+
+    def _store_mem(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.max_bytes:
+            _, old_data = self._mem.popitem(last=False)
+            self._mem_bytes -= len(old_data)
+            self._counters["memory_evictions"] += 1
+
+    def get(self, key):
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return data
+        data = self.store.read(key) if self.store is not None else None
+        with self._lock:
+            if data is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+            self._store_mem(key, data)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._store_mem(key, data)
+        if self.store is not None:
+            self.store.put(key, data)
+
+    def record_not_modified(self):
+        with self._lock:
+            self._counters["not_modified"] += 1
+
+    def stats(self):
+        disk = self.store.stats() if self.store is not None else {}
+        with self._lock:
+            out = dict(self._counters)
+            out.update(
+                memory_entries=len(self._mem),
+                memory_bytes=self._mem_bytes,
+                memory_max_bytes=self.max_bytes,
+                disk_entries=disk.get("entries", 0),
+                disk_bytes=disk.get("bytes", 0),
+                disk_max_bytes=disk.get("max_bytes", 0),
+                disk_evictions=disk.get("evictions", 0),
+            )
+            return out
@@ -0,0 +1,214 @@
+import json
+import struct
+
+# Binary glTF writer for the textured photo frame.
+#
+# The frame is always the same 8-vertex box, so positions are a unit template
+# scaled per request and indices/UVs never change. Vertex order, winding and
+# UVs mirror what trimesh.creation.box + TextureVisuals export, so the output
+# is interchangeable with the trimesh fallback in convert.py.
+
+PASSTHROUGH_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+
+_GLB_MAGIC = 0x46546C67
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+
+# Unit box with its back face on z=0 (trimesh's box translated by T/2).
+_UNIT_POSITIONS = (
+    (-0.5, -0.5, 0.0),
+    (-0.5, -0.5, 1.0),
+    (-0.5, 0.5, 0.0),
+    (-0.5, 0.5, 1.0),
+    (0.5, -0.5, 0.0),
+    (0.5, -0.5, 1.0),
+    (0.5, 0.5, 0.0),
+    (0.5, 0.5, 1.0),
+)
+
+# Planar XY projection, V flipped for glTF's top-left texture origin.
+_UVS = tuple((x + 0.5, 0.5 - y) for x, y, _ in _UNIT_POSITIONS)
+
+_INDICES = (
+    1, 3, 0, 4, 1, 0, 0, 3, 2, 2, 4, 0,
+    1, 7, 3, 5, 1, 4, 5, 7, 1, 3, 7, 2,
+    6, 4, 2, 2, 7, 6, 6, 5, 4, 7, 5, 6,
+)
+
+_INDEX_BYTES = struct.pack("<%dI" % len(_INDICES), *_INDICES)
+_UV_BYTES = struct.pack("<%df" % (2 * len(_UVS)), *(c for uv in _UVS for c in uv))
+
+# Same material trimesh's SimpleMaterial exports by default.
+_MATERIAL = {
+    "pbrMetallicRoughness": {
+        "baseColorTexture": {"index": 0},
+        "baseColorFactor": [0.4, 0.4, 0.4, 1.0],
+        "roughnessFactor": 0.9036020036098448,
+    },
+    "doubleSided": False,
+}
+
+
+def _f32(value):
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def _pad4(data, fill=b"\x00"):
+    return data + fill * (-len(data) % 4)
+
+
+def box_positions(width_m, height_m, thickness_m):
+    scale = (float(width_m), float(height_m), float(thickness_m))
+    return [tuple(u * s for u, s in zip(p, scale)) for p in _UNIT_POSITIONS]
+
+
+def write_frame_glb(image_bytes, mime_type, width_m, height_m, thickness_m):
+    """Return GLB bytes for a box of the given size textured with
+    ``image_bytes``, which are embedded as-is under ``mime_type``."""
+    positions = box_positions(width_m, height_m, thickness_m)
+    pos_bytes = struct.pack("<24f", *(c for p in positions for c in p))
+
+    views = []
+    blob = bytearray()
+    for chunk in (_INDEX_BYTES, pos_bytes, image_bytes, _UV_BYTES):
+        views.append({"buffer": 0, "byteOffset": len(blob), "byteLength": len(chunk)})
+        blob += _pad4(chunk)
+
+    W, H, T = float(width_m), float(height_m), float(thickness_m)
+    gltf = {
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "asset": {"version": "2.0", "generator": "AR-module1"},
+        "accessors": [
+            {"componentType": 5125, "type": "SCALAR", "bufferView": 0,
+             "count": len(_INDICES), "max": [7], "min": [0]},
+            {"componentType": 5126, "type": "VEC3", "byteOffset": 0, "bufferView": 1,
+             "count": 8,
+             "max": [_f32(W / 2.0), _f32(H / 2.0), _f32(T)],
+             "min": [_f32(-W / 2.0), _f32(-H / 2.0), 0.0]},
+            {"componentType": 5126, "type": "VEC2", "byteOffset": 0, "bufferView": 3,
+             "count": 8, "max": [1.0, 1.0], "min": [0.0, 0.0]},
+        ],
+        "meshes": [{
+            "name": "geometry_0",
+            "primitives": [{
+                "attributes": {"POSITION": 1, "TEXCOORD_0": 2},
+                "indices": 0,
+                "mode": 4,
+                "material": 0,
+            }],
+        }],
+        "images": [{"bufferView": 2, "mimeType": mime_type}],
+        "textures": [{"source": 0}],
+        "materials": [_MATERIAL],
+        "nodes": [{"name": "world", "children": [1]}, {"name": "geometry_0", "mesh": 0}],
+        "buffers": [{"byteLength": len(blob)}],
+        "bufferViews": views,
+    }
+
+    return _glb_prefix(gltf, len(blob)) + bytes(blob)
+
+
+def _glb_prefix(gltf, bin_length):
+    # Everything up to and including the BIN chunk header.
+    json_chunk = _pad4(json.dumps(gltf, separators=(",", ":")).encode("utf-8"), b" ")
+    total = 12 + 8 + len(json_chunk) + 8 + bin_length
+    return b"".join((
+        struct.pack("<III", _GLB_MAGIC, 2, total),
+        struct.pack("<II", len(json_chunk), _CHUNK_JSON),
+        json_chunk,
+        struct.pack("<II", bin_length, _CHUNK_BIN),
+    ))
+
+
+def grid_layout(sizes, columns, gap_m):
+    """Centre positions for frames of the given ``(width, height)`` laid out
+    left-to-right, top-to-bottom in ``columns`` columns, centred on the
+    origin."""
+    rows = [sizes[i:i + columns] for i in range(0, len(sizes), columns)]
+    col_w = [max(w for w, _ in sizes[c::columns]) for c in range(min(columns, len(sizes)))]
+    row_h = [max(h for _, h in row) for row in rows]
+    total_w = sum(col_w) + gap_m * (len(col_w) - 1)
+    total_h = sum(row_h) + gap_m * (len(row_h) - 1)
+
+    centres = []
+    y = total_h / 2.0
+    for r, row in enumerate(rows):
+        x = -total_w / 2.0
+        for c in range(len(row)):
+            centres.append((x + col_w[c] / 2.0, y - row_h[r] / 2.0))
+            x += col_w[c] + gap_m
+        y -= row_h[r] + gap_m
+    return centres
+
+
+def iter_gallery_glb(frames, thickness_m):
+    """Yield the bytes of a GLB holding one textured frame per entry of
+    ``frames`` (``(image_bytes, mime_type, width_m, height_m, (x, y))``).
+
+    All frames reference the same unit-box accessors; each gets its own
+    node transform and, since glTF binds materials per primitive, its own
+    single-primitive mesh and material. Image bytes are yielded as they are
+    rather than copied into one buffer.
+    """
+    unit_pos = struct.pack("<24f", *(c for p in _UNIT_POSITIONS for c in p))
+    geometry = b"".join(_pad4(c) for c in (_INDEX_BYTES, unit_pos, _UV_BYTES))
+
+    views = []
+    offset = 0
+    for chunk in (_INDEX_BYTES, unit_pos, _UV_BYTES):
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(chunk)})
+        offset += len(_pad4(chunk))
+
+    gltf = {
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "asset": {"version": "2.0", "generator": "AR-module1"},
+        "accessors": [
+            {"componentType": 5125, "type": "SCALAR", "bufferView": 0,
+             "count": len(_INDICES), "max": [7], "min": [0]},
+            {"componentType": 5126, "type": "VEC3", "byteOffset": 0, "bufferView": 1,
+             "count": 8, "max": [0.5, 0.5, 1.0], "min": [-0.5, -0.5, 0.0]},
+            {"componentType": 5126, "type": "VEC2", "byteOffset": 0, "bufferView": 2,
+             "count": 8, "max": [1.0, 1.0], "min": [0.0, 0.0]},
+        ],
+        "meshes": [],
+        "images": [],
+        "textures": [],
+        "materials": [],
+        "nodes": [{"name": "world", "children": []}],
+        "buffers": [],
+        "bufferViews": views,
+    }
+    T = float(thickness_m)
+    for i, (image_bytes, mime_type, W, H, (x, y)) in enumerate(frames):
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(image_bytes)})
+        offset += len(_pad4(image_bytes))
+        gltf["images"].append({"bufferView": len(views) - 1, "mimeType": mime_type})
+        gltf["textures"].append({"source": i})
+        material = json.loads(json.dumps(_MATERIAL))
+        material["pbrMetallicRoughness"]["baseColorTexture"]["index"] = i
+        gltf["materials"].append(material)
+        gltf["meshes"].append({
+            "name": "frame_%d" % i,
+            "primitives": [{
+                "attributes": {"POSITION": 1, "TEXCOORD_0": 2},
+                "indices": 0,
+                "mode": 4,
+                "material": i,
+            }],
+        })
+        gltf["nodes"][0]["children"].append(len(gltf["nodes"]))
+        gltf["nodes"].append({
+            "name": "frame_%d" % i,
+            "mesh": i,
+            "translation": [float(x), float(y), 0.0],
+            "scale": [float(W), float(H), T],
+        })
+    gltf["buffers"].append({"byteLength": offset})
+
+    yield _glb_prefix(gltf, offset)
+    yield geometry
+    for image_bytes, _, _, _, _ in frames:
+        yield image_bytes
+        yield b"\x00" * (-len(image_bytes) % 4)
@@ -0,0 +1,19 @@
+# gunicorn -c gunicorn.conf.py wsgi:application
+import os
+
+bind = "0.0.0.0:%s" % os.environ.get("PORT", "7860")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+# Import and warm the app once in the master; workers fork from it.
+preload_app = True
+
+# Split the conversion processes between the web workers instead of giving
+# every web worker one per CPU.
+os.environ.setdefault("GLB_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.warm_workers()
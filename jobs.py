@@ -0,0 +1,243 @@
+import math
+import multiprocessing
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMEOUT = "timeout"
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full.")
+        self.retry_after = retry_after
+
+
+class JobTimeout(Exception):
+    pass
+
+
+# Workers are started through a fork server: the pool may be created (or
+# re-created after a crash) from a multithreaded web worker, and forking
+# such a process can deadlock the child on a lock some other thread held.
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _run_with_deadline(timeout_s, deadline, fn, args):
+    # Runs inside the worker process. ``deadline`` is the parent's
+    # time.monotonic() value, which is system-wide on the platforms with
+    # SIGALRM. SIGALRM interrupts the conversion itself, so a runaway job
+    # frees its worker instead of just being abandoned by the parent.
+    if not deadline or not hasattr(signal, "SIGALRM"):
+        return fn(*args)
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        # The caller has already given up on this job while it was queued.
+        raise JobTimeout("Job exceeded %.1fs." % timeout_s)
+
+    def _expired(signum, frame):
+        raise JobTimeout("Job exceeded %.1fs." % timeout_s)
+
+    previous = signal.signal(signal.SIGALRM, _expired)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class Job:
+    def __init__(self, job_id, future, created, deadline=None, key=None):
+        self.id = job_id
+        self.future = future
+        self.key = key
+        self.created = created
+        self.deadline = deadline
+        self.finished = None
+        self.cancelled = False
+
+    @property
+    def status(self):
+        if self.cancelled:
+            return CANCELLED
+        if not self.future.done():
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                return TIMEOUT
+            return RUNNING if self.future.running() else QUEUED
+        exc = self.future.exception()
+        if exc is None:
+            return DONE
+        return TIMEOUT if isinstance(exc, JobTimeout) else FAILED
+
+    @property
+    def error(self):
+        if self.future.done() and not self.cancelled:
+            return self.future.exception()
+        return None
+
+    def to_dict(self):
+        out = {"id": self.id, "status": self.status}
+        if self.error is not None:
+            out["error"] = str(self.error)
+        return out
+
+
+class JobManager:
+    """Runs conversions on a bounded process pool.
+
+    At most ``max_pending`` jobs may be queued or running; further submits
+    raise :class:`QueueFull`. ``timeout_s`` is an end-to-end deadline
+    counted from submission, so time spent queued counts against it; the
+    worker enforces the same deadline, skipping jobs that expired in the
+    queue. Finished jobs are kept for ``result_ttl_s`` seconds so their
+    results can be fetched.
+    """
+
+    def __init__(self, max_workers, max_pending, timeout_s, result_ttl_s=300):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout_s = timeout_s
+        self.result_ttl_s = result_ttl_s
+        self._lock = threading.Lock()
+        self._pool = None
+        self._jobs = {}
+        self._avg_duration = 1.0
+
+    def _get_pool(self):
+        # Created on first use so preforking servers start the pool in each
+        # worker rather than sharing one across a fork.
+        if self._pool is None:
+            context = multiprocessing.get_context(_START_METHOD)
+            if _START_METHOD == "forkserver":
+                # Workers fork from a server that has the converter loaded.
+                context.set_forkserver_preload(["convert"])
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._pool
+
+    def _pending(self):
+        # Cancelled jobs that are still running hold a worker, so they count.
+        return sum(1 for job in self._jobs.values() if not job.future.done())
+
+    def _expire(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None
+                       and now - job.finished > self.result_ttl_s]:
+            del self._jobs[job_id]
+
+    def _on_done(self, job):
+        with self._lock:
+            job.finished = time.monotonic()
+            if not job.future.cancelled():
+                duration = job.finished - job.created
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+
+    def warm_up(self, fn, *args):
+        """Start the pool and run ``fn(*args)`` on it once per worker, so
+        the first real job does not pay for process start-up."""
+        with self._lock:
+            pool = self._get_pool()
+        for future in [pool.submit(fn, *args) for _ in range(self.max_workers)]:
+            future.result()
+
+    def pending(self):
+        with self._lock:
+            return self._pending()
+
+    def retry_after(self):
+        backlog = max(1, self._pending())
+        return max(1, math.ceil(self._avg_duration * backlog / self.max_workers))
+
+    def submit(self, fn, *args, key=None):
+        with self._lock:
+            self._expire()
+            if self._pending() >= self.max_pending:
+                raise QueueFull(self.retry_after())
+            created = time.monotonic()
+            deadline = created + self.timeout_s if self.timeout_s else None
+            try:
+                future = self._get_pool().submit(
+                    _run_with_deadline, self.timeout_s, deadline, fn, args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool.
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                future = self._get_pool().submit(
+                    _run_with_deadline, self.timeout_s, deadline, fn, args)
+            job = Job(uuid.uuid4().hex, future, created, deadline, key=key)
+            self._jobs[job.id] = job
+        future.add_done_callback(lambda _: self._on_done(job))
+        return job
+
+    def completed(self, result=None, key=None, error=None):
+        """Register an already-finished job, e.g. for a cache hit or work
+        that was run inline."""
+        future = Future()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        job = Job(uuid.uuid4().hex, future, time.monotonic(), key=key)
+        job.finished = job.created
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id):
+        """Forget a finished job once its result has been collected. A job
+        that is still running (e.g. one its caller gave up waiting for)
+        keeps counting towards ``max_pending`` and is expired later."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.future.done():
+                del self._jobs[job_id]
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if not job.future.done():
+            # A job already handed to a worker cannot be interrupted; its
+            # result is discarded when it completes.
+            job.cancelled = True
+            job.future.cancel()
+        return job
+
+    def wait(self, job, timeout=None):
+        """Block until ``job`` finishes and return its result.
+
+        Raises the job's exception, :class:`JobTimeout` if it runs past its
+        deadline, or ``CancelledError`` if it was cancelled.
+        """
+        if timeout is None and job.deadline is not None:
+            # Small grace period for the worker's own alarm to fire first.
+            timeout = max(0.0, job.deadline - time.monotonic()) + 1.0
+        try:
+            result = job.future.result(timeout=timeout)
+        except TimeoutError:
+            self.cancel(job.id)
+            raise JobTimeout("Job exceeded %.1fs." % self.timeout_s)
+        if job.cancelled:
+            raise CancelledError()
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
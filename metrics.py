@@ -0,0 +1,215 @@
+import bisect
+import contextvars
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight hot-path instrumentation: stage() timings are appended to the
+# list bound to the current context (a request, or a job in a worker
+# process) and folded into process-wide histograms rendered at /metrics in
+# the Prometheus text format.
+
+_stages = contextvars.ContextVar("glb_stages", default=None)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1 KiB .. 256 MiB
+
+
+@contextmanager
+def stage(name):
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages.append((name, time.perf_counter() - start))
+
+
+def begin():
+    """Start collecting stages in the current context; returns a token for
+    :func:`end`."""
+    return _stages.set([])
+
+
+def end(token):
+    stages = _stages.get() or []
+    _stages.reset(token)
+    return stages
+
+
+class _Imported(tuple):
+    # A (name, seconds) stage measured in a worker process; it is folded
+    # into the histograms by observe_job, not again by the request.
+    __slots__ = ()
+
+
+def extend(stages):
+    """Add stages measured elsewhere (a job's worker-side stages) to the
+    current context's list, for the Server-Timing header only."""
+    current = _stages.get()
+    if current is not None:
+        current.extend(_Imported(s) for s in stages)
+
+
+def observe_stages(stages):
+    for s in stages:
+        if not isinstance(s, _Imported):
+            STAGE_SECONDS.observe(s[1], s[0])
+
+
+def run_timed(fn, *args):
+    """Call ``fn(*args)`` and return ``(result, stages, peak_rss_bytes)``;
+    used as the job pool entry point so worker-side measurements reach the
+    parent."""
+    token = begin()
+    try:
+        result = fn(*args)
+        return result, _stages.get(), _peak_rss_bytes(resource.RUSAGE_SELF)
+    finally:
+        _stages.reset(token)
+
+
+def server_timing(stages, **sizes):
+    totals = {}
+    for name, seconds in stages:
+        totals[name] = totals.get(name, 0.0) + seconds
+    parts = ["%s;dur=%.2f" % (name, seconds * 1000.0) for name, seconds in totals.items()]
+    parts.extend('%s;desc="%d bytes"' % (name, n) for name, n in sizes.items() if n is not None)
+    return ", ".join(parts)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label = label
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, label_value=None):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0, 0.0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help_text),
+                 "# TYPE %s histogram" % self.name]
+        with self._lock:
+            for label_value, (counts, count, total) in sorted(self._series.items(),
+                                                              key=lambda kv: str(kv[0])):
+                base = {} if self.label is None else {self.label: label_value}
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append("%s_bucket%s %d" % (
+                        self.name, _labels(dict(base, le=_num(bound))), cumulative))
+                lines.append("%s_bucket%s %d" % (self.name, _labels(dict(base, le="+Inf")), count))
+                lines.append("%s_sum%s %s" % (self.name, _labels(base), _num(total)))
+                lines.append("%s_count%s %d" % (self.name, _labels(base), count))
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + 1
+
+    def render(self):
+        lines = ["# HELP %s %s" % (self.name, self.help_text),
+                 "# TYPE %s counter" % self.name]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append("%s%s %d" % (
+                    self.name, _labels(dict(zip(self.labels, label_values))), value))
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, fn=None):
+        self.name = name
+        self.help_text = help_text
+        self.fn = fn
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def add(self, delta):
+        with self._lock:
+            self.value += delta
+
+    def set_max(self, value):
+        with self._lock:
+            self.value = max(self.value, value)
+
+    def render(self):
+        value = self.fn() if self.fn is not None else self.value
+        return ["# HELP %s %s" % (self.name, self.help_text),
+                "# TYPE %s gauge" % self.name,
+                "%s %s" % (self.name, _num(value))]
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in labels.items())
+
+
+def _peak_rss_bytes(who):
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+STAGE_SECONDS = Histogram(
+    "glb_stage_seconds", "Time spent per request or conversion stage.", SECONDS_BUCKETS,
+    label="stage")
+REQUEST_SECONDS = Histogram(
+    "glb_request_seconds", "Request handling time by endpoint.", SECONDS_BUCKETS, label="endpoint")
+INPUT_BYTES = Histogram("glb_input_bytes", "Size of uploaded images.", BYTES_BUCKETS)
+OUTPUT_BYTES = Histogram("glb_output_bytes", "Size of generated GLBs.", BYTES_BUCKETS)
+REQUESTS = Counter("glb_requests_total", "Requests by endpoint and status.",
+                   ("endpoint", "method", "status"))
+IN_FLIGHT = Gauge("glb_requests_in_flight", "Requests currently being handled.")
+PEAK_RSS = Gauge("glb_process_peak_rss_bytes", "Peak RSS of this process.",
+                 lambda: _peak_rss_bytes(resource.RUSAGE_SELF))
+WORKER_PEAK_RSS = Gauge("glb_worker_peak_rss_bytes", "Highest peak RSS reported by a pool worker.")
+
+_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, INPUT_BYTES, OUTPUT_BYTES,
+            REQUESTS, IN_FLIGHT, PEAK_RSS, WORKER_PEAK_RSS]
+
+
+def observe_job(stages, peak_rss):
+    observe_stages(stages)
+    WORKER_PEAK_RSS.set_max(peak_rss)
+
+
+def render(extra=()):
+    lines = []
+    for metric in list(_METRICS) + list(extra):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,145 @@
+"""Report cold-start costs: import time and time to first response.
+
+    python startup_check.py            # fresh interpreter, Flask test client
+    python startup_check.py --serve    # real gunicorn server on a free port
+
+Prints a JSON report. --max-first-response-ms makes it exit non-zero when
+the first conversion is slower than the given budget.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+
+def _sample_upload():
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (640, 480), (200, 120, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def _child():
+    # Runs in a fresh interpreter so module caches are cold.
+    t0 = time.perf_counter()
+    import app  # noqa: F401
+    t_app = time.perf_counter()
+    import wsgi
+    t_warm = time.perf_counter()
+    wsgi.warm_workers()
+    t_pool = time.perf_counter()
+
+    client = wsgi.application.test_client()
+    data = _sample_upload()
+    start = time.perf_counter()
+    resp = client.post("/make-glb", data={"file": (io.BytesIO(data), "sample.jpg")})
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    client.post("/make-glb", data={"file": (io.BytesIO(data), "sample.jpg")})
+    second = time.perf_counter() - start
+    print(json.dumps({
+        "import_app_ms": (t_app - t0) * 1000.0,
+        "warm_up_ms": (t_warm - t_app) * 1000.0,
+        "pool_warm_up_ms": (t_pool - t_warm) * 1000.0,
+        "first_response_ms": first * 1000.0,
+        "first_response_status": resp.status_code,
+        "cached_response_ms": second * 1000.0,
+        "trimesh_imported": "trimesh" in sys.modules,
+        "numpy_imported": "numpy" in sys.modules,
+    }))
+
+
+def _in_process():
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, __file__, "--child"],
+                         capture_output=True, text=True, check=True)
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    report["process_total_ms"] = (time.perf_counter() - start) * 1000.0
+    return report
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def _served(timeout_s):
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port))
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--bind", "127.0.0.1:%d" % port, "wsgi:application"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise SystemExit("gunicorn exited with status %d" % proc.returncode)
+            if time.perf_counter() - start > timeout_s:
+                raise SystemExit("server not ready after %.0fs" % timeout_s)
+            try:
+                if _request(port, "GET", "/healthz") == 200:
+                    break
+            except OSError:
+                time.sleep(0.05)
+        ready = time.perf_counter() - start
+
+        boundary = "startupcheck"
+        body = (("--%s\r\nContent-Disposition: form-data; name=\"file\"; filename=\"s.jpg\"\r\n"
+                 "Content-Type: image/jpeg\r\n\r\n" % boundary).encode()
+                + _sample_upload() + ("\r\n--%s--\r\n" % boundary).encode())
+        headers = {"Content-Type": "multipart/form-data; boundary=%s" % boundary}
+        t = time.perf_counter()
+        status = _request(port, "POST", "/make-glb", body, headers)
+        first = time.perf_counter() - t
+        return {
+            "time_to_ready_ms": ready * 1000.0,
+            "first_response_ms": first * 1000.0,
+            "first_response_status": status,
+            "time_to_first_response_ms": (time.perf_counter() - start) * 1000.0,
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--serve", action="store_true", help="measure a real gunicorn server")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-first-response-ms", type=float, default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child()
+        return 0
+    report = _served(args.timeout) if args.serve else _in_process()
+    print(json.dumps(report, indent=2, sort_keys=True))
+    if report.get("first_response_status") != 200:
+        return 1
+    if (args.max_first_response_ms is not None
+            and report["first_response_ms"] > args.max_first_response_ms):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# The service modules live at the repository root rather than in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    # app reads its settings at import time.
+    os.environ["GLB_ARTIFACT_DIR"] = str(tmp_path_factory.mktemp("models"))
+    os.environ.setdefault("GLB_WORKERS", "1")
+    import app
+    yield app
+    app.jobs.shutdown()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def make_image(fmt="JPEG", size=(64, 48), color=(200, 120, 40)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, fmt)
+    return out.getvalue()
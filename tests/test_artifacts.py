@@ -0,0 +1,100 @@
+import gzip
+import os
+import time
+
+import pytest
+
+from artifacts import ArtifactStore
+
+_GLB = b"glTF" + b"\x00" * 20000  # compresses well
+
+
+def _key(i):
+    return "%064x" % i
+
+
+def _wait_for(path, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, path
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path), max_bytes=10 ** 9)
+
+
+@pytest.fixture
+def served(app_module, monkeypatch, store):
+    monkeypatch.setattr(app_module, "artifacts", store)
+    store.put(_key(1), _GLB)
+    _wait_for(store.path(_key(1), "gzip"))
+    return store
+
+
+def test_put_read_and_gzip_variant(store):
+    assert store.put(_key(1), _GLB)
+    assert store.exists(_key(1)) and store.read(_key(1)) == _GLB
+    _wait_for(store.path(_key(1), "gzip"))
+    with open(store.path(_key(1), "gzip"), "rb") as fh:
+        assert gzip.decompress(fh.read()) == _GLB
+    assert not [name for name in os.listdir(store.root) if name.endswith(".tmp")]
+
+
+def test_trim_evicts_least_recently_used(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=3500)
+    for i in range(3):
+        store.put(_key(i), os.urandom(1000))  # incompressible: no variants
+        time.sleep(0.01)
+    store.read(_key(0))
+    store.put(_key(3), os.urandom(1000))
+
+    assert not store.exists(_key(1))
+    assert all(store.exists(_key(i)) for i in (0, 2, 3))
+    assert store.stats()["evictions"] == 1
+
+
+def test_budget_covers_other_processes_files(tmp_path):
+    ours = ArtifactStore(str(tmp_path), max_bytes=3500)
+    theirs = ArtifactStore(str(tmp_path), max_bytes=3500)
+    for i in range(3):
+        theirs.put(_key(i), os.urandom(1000))
+    ours._scanned = 0.0  # as if the last rescan was long ago
+    ours.put(_key(3), os.urandom(1000))
+
+    assert sum(ours.exists(_key(i)) for i in range(4)) == 3
+
+
+def test_model_is_immutable(client, served):
+    resp = client.get("/models/%s.glb" % _key(1))
+    assert resp.status_code == 200 and resp.data == _GLB
+    assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert resp.headers["ETag"] == '"%s"' % _key(1)
+    assert "Content-Encoding" not in resp.headers
+
+    resp = client.get("/models/%s.glb" % _key(1), headers={"If-None-Match": '"%s"' % _key(1)})
+    assert resp.status_code == 304
+
+
+def test_model_gzip_variant(client, served):
+    resp = client.get("/models/%s.glb" % _key(1), headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["ETag"] == '"%s-gzip"' % _key(1)
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(resp.data) == _GLB
+
+
+def test_model_range(client, served):
+    resp = client.get("/models/%s.glb" % _key(1),
+                      headers={"Range": "bytes=0-3", "Accept-Encoding": "gzip"})
+    assert resp.status_code == 206
+    assert resp.data == b"glTF"
+    assert "Content-Encoding" not in resp.headers
+    assert resp.headers["Content-Range"] == "bytes 0-3/%d" % len(_GLB)
+
+
+def test_missing_or_malformed_model(client, served):
+    assert client.get("/models/%s.glb" % _key(2)).status_code == 404
+    assert client.get("/models/not-a-key.glb").status_code == 404
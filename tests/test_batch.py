@@ -0,0 +1,45 @@
+import io
+import json
+import os
+import struct
+import zipfile
+
+from conftest import make_image
+
+
+def _files(n, size=(64, 48)):
+    return [(io.BytesIO(make_image("PNG", size, (i * 30, 90, 9))), "frame.png") for i in range(n)]
+
+
+def test_zip_batch(client):
+    resp = client.post("/make-glb/batch", data={"file": _files(3) + [(io.BytesIO(b"junk"), "bad.png")]})
+    assert resp.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        assert sorted(zf.namelist()) == ["errors.json", "frame-2.glb", "frame-3.glb", "frame.glb"]
+        assert list(json.loads(zf.read("errors.json"))) == ["bad.glb"]
+        assert zf.read("frame.glb")[:4] == b"glTF"
+
+
+def test_gallery_allows_zero_gap(client):
+    resp = client.post("/make-glb/batch", data={"file": _files(2), "mode": "gallery",
+                                                "columns": "2", "gap_m": "0"})
+    assert resp.status_code == 200
+    json_len = struct.unpack("<I", resp.data[12:16])[0]
+    gltf = json.loads(resp.data[20:20 + json_len])
+    xs = [node["translation"][0] for node in gltf["nodes"][1:]]
+    assert xs == [-0.25, 0.25]  # two 0.5 m frames, flush
+
+    resp = client.post("/make-glb/batch", data={"file": _files(1), "mode": "gallery", "gap_m": "-1"})
+    assert resp.status_code == 400
+
+
+def test_batch_may_exceed_single_upload_limit(client, app_module, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "MAX_CONTENT_LENGTH", 64 * 1024)
+    noisy = [(io.BytesIO(os.urandom(40 * 1024)), "x.png") for _ in range(3)]
+    resp = client.post("/make-glb/batch", data={"file": noisy})
+    assert resp.status_code == 200  # unreadable images end up in errors.json
+
+    monkeypatch.setattr(app_module, "MAX_BATCH_BYTES", 64 * 1024)
+    noisy = [(io.BytesIO(os.urandom(40 * 1024)), "x.png") for _ in range(3)]
+    assert client.post("/make-glb/batch", data={"file": noisy}).status_code == 413
+    assert client.get("/capabilities").json["max_batch_bytes"] == 64 * 1024
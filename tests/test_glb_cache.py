@@ -0,0 +1,75 @@
+import io
+
+from conftest import make_image
+from glb_cache import GLBCache, cache_key
+
+
+def test_params_are_normalised():
+    assert cache_key("abc", width_m="0.5") == cache_key("abc", width_m=0.5)
+    assert cache_key("abc", width_m=0.5) != cache_key("abc", width_m=0.6)
+
+
+def test_lru_evicts_by_bytes():
+    cache = GLBCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # "a" is now the most recent
+    cache.put("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234" and cache.get("c") == b"1234"
+    stats = cache.stats()
+    assert stats["memory_bytes"] == 8 and stats["memory_entries"] == 2
+    assert stats["memory_evictions"] == 1
+
+
+def test_oversized_entries_skip_memory():
+    cache = GLBCache(max_bytes=4)
+    cache.put("a", b"12345")
+    assert cache.get("a") is None
+    assert cache.stats()["memory_bytes"] == 0
+
+
+class _Store:
+    def __init__(self):
+        self.files = {}
+
+    def put(self, key, data):
+        self.files[key] = data
+        return True
+
+    def read(self, key):
+        return self.files.get(key)
+
+    def stats(self):
+        return {"entries": len(self.files), "bytes": sum(map(len, self.files.values()))}
+
+
+def test_store_backs_evicted_entries():
+    store = _Store()
+    cache = GLBCache(max_bytes=4, store=store)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+
+    assert cache.get("a") == b"1234"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["disk_entries"] == 2
+
+
+def test_etag_and_not_modified(client):
+    upload = make_image()
+    resp = client.post("/make-glb", data={"file": (io.BytesIO(upload), "a.jpg")})
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"].strip('"')
+    assert resp.headers["Content-Location"] == "/models/%s.glb" % etag
+
+    resp = client.post("/make-glb", data={"file": (io.BytesIO(upload), "a.jpg")})
+    assert resp.headers["X-Cache"] == "HIT"
+
+    resp = client.post("/make-glb", data={"file": (io.BytesIO(upload), "a.jpg")},
+                       headers={"If-None-Match": '"%s"' % etag})
+    assert resp.status_code == 304 and not resp.data
+
+    resp = client.post("/make-glb", data={"file": (io.BytesIO(upload), "a.jpg"), "width_m": "1"},
+                       headers={"If-None-Match": '"%s"' % etag})
+    assert resp.status_code == 200
@@ -0,0 +1,29 @@
+import io
+
+import numpy as np
+import pytest
+import trimesh
+from PIL import Image
+
+from convert import _create_glb_trimesh
+from glb_writer import write_frame_glb
+
+
+def _load(glb_bytes):
+    scene = trimesh.load(io.BytesIO(glb_bytes), file_type="glb", process=False)
+    (mesh,) = scene.geometry.values()
+    return mesh
+
+
+@pytest.mark.parametrize("size", [(0.5, 0.375, 0.01), (1.2, 0.3, 0.05)])
+def test_fast_writer_matches_trimesh(size):
+    img = Image.new("RGB", (64, 48), (200, 120, 40))
+    png = io.BytesIO()
+    img.save(png, "PNG")
+
+    fast = _load(write_frame_glb(png.getvalue(), "image/png", *size))
+    reference = _load(_create_glb_trimesh(img.convert("RGBA"), *size))
+
+    np.testing.assert_allclose(fast.vertices, reference.vertices, atol=1e-6)
+    np.testing.assert_array_equal(fast.faces, reference.faces)
+    np.testing.assert_allclose(fast.visual.uv, reference.visual.uv, atol=1e-6)
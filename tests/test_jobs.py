@@ -0,0 +1,106 @@
+import hashlib
+import io
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from conftest import make_image
+from jobs import CANCELLED, DONE, TIMEOUT, JobManager, JobTimeout, QueueFull
+
+# Long enough to outlast the short deadlines below. Runs in C, so the
+# worker's SIGALRM handler cannot interrupt it.
+_SLOW_C_CALL = (hashlib.pbkdf2_hmac, "sha256", b"x", b"y", 8_000_000)
+
+
+@pytest.fixture
+def manager():
+    managers = []
+
+    def make(max_workers=1, max_pending=4, timeout_s=10):
+        m = JobManager(max_workers, max_pending, timeout_s)
+        managers.append(m)
+        return m
+
+    yield make
+    for m in managers:
+        m.shutdown()
+
+
+def test_submit_and_wait(manager):
+    m = manager()
+    job = m.submit(divmod, 7, 2)
+    assert m.wait(job) == (3, 1)
+    assert job.status == DONE
+
+
+def test_queue_full(manager):
+    m = manager(max_pending=1)
+    job = m.submit(time.sleep, 0.5)
+    with pytest.raises(QueueFull) as exc_info:
+        m.submit(time.sleep, 0)
+    assert exc_info.value.retry_after >= 1
+    m.wait(job)
+    m.wait(m.submit(time.sleep, 0))
+
+
+def test_worker_enforces_deadline(manager):
+    m = manager(timeout_s=0.3)
+    job = m.submit(time.sleep, 5)
+    with pytest.raises(JobTimeout):
+        m.wait(job)
+    assert job.status == TIMEOUT
+    # The worker was freed rather than left sleeping.
+    assert m.wait(m.submit(divmod, 1, 1)) == (1, 0)
+
+
+def test_deadline_includes_queue_time(manager):
+    m = manager(timeout_s=0.5)
+    m.wait(m.submit(divmod, 1, 1))  # start the pool outside the timed part
+    first = m.submit(time.sleep, 5)
+    queued = m.submit(divmod, 1, 1)
+    for job in (first, queued):
+        with pytest.raises(JobTimeout):
+            m.wait(job)
+
+
+def test_cancel(manager):
+    m = manager()
+    running = m.submit(time.sleep, 0.3)
+    queued = m.submit(time.sleep, 0)
+    assert m.cancel(queued.id) is queued
+    assert queued.status == CANCELLED
+    with pytest.raises(CancelledError):
+        m.wait(queued)
+    m.wait(running)
+    assert m.cancel("no-such-job") is None
+
+
+def test_discarded_running_job_still_counts(manager):
+    m = manager(max_pending=1, timeout_s=0.2)
+    job = m.submit(*_SLOW_C_CALL)
+    with pytest.raises(JobTimeout):
+        m.wait(job, timeout=0.1)
+    m.discard(job.id)
+
+    assert not job.future.done()
+    assert m.pending() == 1
+    with pytest.raises(QueueFull):
+        m.submit(divmod, 1, 1)
+
+
+def test_queue_full_returns_429(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.jobs, "max_pending", 0)
+    upload = make_image(color=(1, 2, 3))
+    resp = client.post("/make-glb", data={"file": (io.BytesIO(upload), "a.jpg")})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_timed_out_job_is_not_reported_cancelled(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.jobs, "timeout_s", 0.2)
+    job = app_module.jobs.submit(*_SLOW_C_CALL)
+    time.sleep(0.4)
+
+    assert client.get("/jobs/%s/result" % job.id).status_code == 504
+    assert client.get("/jobs/%s" % job.id).json["status"] == "timeout"
@@ -0,0 +1,81 @@
+import io
+import json
+import struct
+
+from PIL import Image, PngImagePlugin
+
+from convert import create_glb_from_image, prepare_texture
+from texture import strip_metadata
+
+
+def _jpeg_with_exif():
+    img = Image.new("RGB", (32, 16), (10, 200, 30))
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    exif[0x8825] = {2: (52.0, 31.0, 12.0)}  # GPSInfo / GPSLatitude
+    out = io.BytesIO()
+    img.save(out, "JPEG", exif=exif, comment=b"secret")
+    return out.getvalue()
+
+
+def test_jpeg_metadata_is_stripped_losslessly():
+    data = _jpeg_with_exif()
+    stripped = strip_metadata(data, "JPEG")
+
+    assert b"Exif" not in stripped and b"PhoneMaker" not in stripped
+    assert b"secret" not in stripped
+    # Everything from the start-of-scan marker on is copied unchanged.
+    assert data[data.index(b"\xff\xda"):] in stripped
+    with Image.open(io.BytesIO(stripped)) as img:
+        assert not img.getexif()
+        assert img.tobytes() == Image.open(io.BytesIO(data)).tobytes()
+
+
+def test_png_text_chunks_are_stripped():
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Comment", "secret")
+    info.add_itxt("Location", "somewhere")
+    out = io.BytesIO()
+    Image.new("RGBA", (8, 8), (1, 2, 3, 128)).save(out, "PNG", pnginfo=info)
+    stripped = strip_metadata(out.getvalue(), "PNG")
+
+    assert b"secret" not in stripped and b"somewhere" not in stripped
+    with Image.open(io.BytesIO(stripped)) as img:
+        assert img.tobytes() == Image.open(out).tobytes()
+
+
+def test_passthrough_embeds_stripped_bytes():
+    tex_bytes, mime_type, size = prepare_texture(io.BytesIO(_jpeg_with_exif()))
+    assert mime_type == "image/jpeg" and size == (32, 16)
+    assert b"PhoneMaker" not in tex_bytes
+
+
+def test_unparseable_input_is_rejected():
+    assert strip_metadata(b"\xff\xd8\xff\xe1\xff\xff", "JPEG") is None
+    assert strip_metadata(b"not a png", "PNG") is None
+
+
+def _rotated_jpeg():
+    # Stored landscape, displayed portrait (Orientation 6: rotate 90 CW).
+    img = Image.new("RGB", (80, 40), (10, 200, 30))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    out = io.BytesIO()
+    img.save(out, "JPEG", exif=exif)
+    return out.getvalue()
+
+
+def test_exif_orientation_is_applied():
+    tex_bytes, mime_type, size = prepare_texture(io.BytesIO(_rotated_jpeg()))
+    assert size == (40, 80)
+    assert mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(tex_bytes)) as img:
+        assert img.size == (40, 80)
+        assert img.getexif().get(0x0112, 1) == 1
+
+
+def test_frame_aspect_follows_orientation():
+    scene = create_glb_from_image(io.BytesIO(_rotated_jpeg()), width_m=0.5)
+    json_len = struct.unpack("<I", scene[12:16])[0]
+    gltf = json.loads(scene[20:20 + json_len])
+    assert gltf["accessors"][1]["max"][:2] == [0.25, 0.5]
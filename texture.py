@@ -0,0 +1,180 @@
+import io
+import struct
+
+from PIL import Image, ImageOps
+
+from metrics import stage
+
+# Longest texture edge per quality tier; None means "only the global cap".
+QUALITY_TIERS = {"preview": 512, "standard": 2048, "full": None}
+DEFAULT_QUALITY = "standard"
+
+JPEG_QUALITY = 85
+
+_ALPHA_MODES = {"RGBA", "LA", "PA", "RGBa", "La"}
+_WORKING_MODES = {"L", "RGB", "RGBA"}
+
+# JPEG segments that affect decoding: APP0 (JFIF), APP2 (ICC profile) and
+# APP14 (Adobe colour transform). Other APPn segments (EXIF/XMP in APP1,
+# IPTC in APP13, ...) and comments are metadata only.
+_JPEG_KEEP_APP = {0xE0, 0xE2, 0xEE}
+_JPEG_COM = 0xFE
+_JPEG_SOS = 0xDA
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_METADATA_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+
+_ORIENTATION_TAG = 0x0112
+# EXIF orientations that store the image rotated by 90 degrees.
+_SIDEWAYS = {5, 6, 7, 8}
+
+
+class TextureTooLarge(ValueError):
+    pass
+
+
+def orientation(img):
+    """EXIF orientation of an opened image; 1 means stored upright."""
+    return img.getexif().get(_ORIENTATION_TAG, 1)
+
+
+def upright_size(img):
+    """Size of the image as displayed, i.e. after its EXIF orientation."""
+    w, h = img.size
+    return (h, w) if orientation(img) in _SIDEWAYS else (w, h)
+
+
+def max_edge_for(quality, cap=None):
+    edge = QUALITY_TIERS[quality]
+    if edge is None:
+        return cap
+    return min(edge, cap) if cap else edge
+
+
+def fits(size, max_edge):
+    return not max_edge or max(size) <= max_edge
+
+
+def _is_opaque(img):
+    return img.mode != "RGBA" or img.getchannel("A").getextrema()[0] == 255
+
+
+def load_texture(img, max_edge, max_decode_pixels):
+    """Decode an opened (not yet loaded) image scaled down to fit
+    ``max_edge``, converted to L, RGB or RGBA and turned upright according
+    to its EXIF orientation.
+
+    JPEGs are decoded at a reduced DCT scale via ``Image.draft`` so the full
+    resolution bitmap never exists in memory; other formats are checked
+    against ``max_decode_pixels`` before decoding and shrunk with ``reduce``.
+    """
+    w, h = img.size
+    upright = orientation(img) == 1
+    if max_edge and max(w, h) > max_edge:
+        scale = max_edge / float(max(w, h))
+        target = (max(1, round(w * scale)), max(1, round(h * scale)))
+        if img.format == "JPEG":
+            img.draft(img.mode if img.mode in ("L", "RGB") else "RGB", target)
+    else:
+        target = (w, h)
+
+    if max_decode_pixels and img.size[0] * img.size[1] > max_decode_pixels:
+        raise TextureTooLarge(
+            "Image is %dx%d; at most %d pixels can be decoded."
+            % (w, h, max_decode_pixels))
+
+    with stage("decode"):
+        img.load()
+    if img.mode not in _WORKING_MODES:
+        with stage("convert"):
+            has_alpha = img.mode in _ALPHA_MODES or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+    if img.size != target:
+        with stage("resize"):
+            factor = min(img.size[0] // target[0], img.size[1] // target[1])
+            if factor >= 2:
+                img = img.reduce(factor)
+            img = img.resize(target, Image.LANCZOS)
+    if not upright:
+        with stage("orient"):
+            img = ImageOps.exif_transpose(img)
+    return img
+
+
+def _strip_jpeg(data):
+    if data[:2] != b"\xff\xd8":
+        return None
+    out = [data[:2]]
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            out.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        end = pos + 2 + length
+        if length < 2 or end > len(data):
+            return None
+        if marker == _JPEG_SOS:
+            # Entropy-coded data follows; nothing after it is metadata we
+            # need to look at.
+            out.append(data[pos:])
+            return b"".join(out)
+        if not (marker == _JPEG_COM or (0xE0 <= marker <= 0xEF
+                                         and marker not in _JPEG_KEEP_APP)):
+            out.append(data[pos:end])
+        pos = end
+    return None
+
+
+def _strip_png(data):
+    if data[:8] != _PNG_SIGNATURE:
+        return None
+    out = [data[:8]]
+    pos = 8
+    while pos + 12 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if end > len(data):
+            return None
+        if kind not in _PNG_METADATA_CHUNKS:
+            out.append(data[pos:end])
+        pos = end
+        if kind == b"IEND":
+            return b"".join(out)
+    return None
+
+
+def strip_metadata(data, fmt):
+    """Return ``data`` (a JPEG or PNG file) without EXIF, XMP, comments and
+    text chunks, leaving the compressed pixels untouched; None if the file
+    could not be parsed.
+
+    Uploads embedded as-is end up in publicly cached GLBs, so GPS positions
+    and other camera metadata must not travel with them.
+    """
+    with stage("strip"):
+        if fmt == "JPEG":
+            return _strip_jpeg(data)
+        if fmt == "PNG":
+            return _strip_png(data)
+    return None
+
+
+def encode_texture(img):
+    """Encode a loaded texture for embedding, as JPEG when it is opaque and
+    PNG otherwise. Returns ``(bytes, mime_type)``."""
+    out = io.BytesIO()
+    with stage("encode"):
+        if _is_opaque(img):
+            img = img.convert("L" if img.mode == "L" else "RGB")
+            img.save(out, "JPEG", quality=JPEG_QUALITY)
+            return out.getvalue(), "image/jpeg"
+        img.save(out, "PNG")
+        return out.getvalue(), "image/png"
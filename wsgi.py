@@ -0,0 +1,48 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The app is loaded once in the gunicorn master (preload_app) and warmed up
+there, so forked workers start with PIL's codecs and the GLB writer already
+imported. Each worker then starts and warms its own conversion pool in
+gunicorn's post_fork hook before it accepts requests.
+"""
+import io
+import os
+
+from PIL import Image
+
+from app import app, jobs
+from convert import create_glb_from_image
+
+
+def _sample_images():
+    images = []
+    for fmt, mode in (("JPEG", "RGB"), ("PNG", "RGBA"), ("WEBP", "RGB")):
+        out = io.BytesIO()
+        Image.new(mode, (64, 48), (90, 120, 150, 255)[:len(mode)]).save(out, fmt)
+        images.append(out.getvalue())
+    return images
+
+
+def warm_up():
+    """Convert tiny sample images in-process, loading the decoders and
+    encoders each code path needs (passthrough and re-encode)."""
+    for data in _sample_images():
+        create_glb_from_image(io.BytesIO(data), 0.5, 0.01, 32)
+    with app.test_client() as client:
+        client.get("/healthz")
+
+
+def warm_workers():
+    """Start this process's conversion pool and run one sample per worker."""
+    jobs.warm_up(create_glb_from_image, io.BytesIO(_sample_images()[0]), 0.5, 0.01, 32)
+
+
+def create_app(warm=True):
+    if warm:
+        warm_up()
+    return app
+
+
+application = create_app(warm=os.environ.get("GLB_WARM_UP", "1") != "0")